@@ -15,36 +15,49 @@ Usage:
     Reads JSON from stdin containing tool_input (questions) and tool_response (answers).
 """
 
-import importlib.util
-import json
+import io
 import os
-import re as _re_module
-import subprocess
+import re
 import sys
-import tempfile
-from pathlib import Path
-from typing import Optional
-
-# Import shared helpers from sibling modules (same directory)
-_hooks_dir = Path(__file__).parent
-
-_adf_module_path = _hooks_dir / "markdown_to_adf.py"
-_adf_spec = importlib.util.spec_from_file_location("markdown_to_adf", _adf_module_path)
-if _adf_spec and _adf_spec.loader:
-    _adf_mod = importlib.util.module_from_spec(_adf_spec)
-    _adf_spec.loader.exec_module(_adf_mod)
-    markdown_to_adf_json = _adf_mod.markdown_to_adf_json
-else:
-    raise ImportError(f"Could not load markdown_to_adf from {_adf_module_path}")
-
-_acli_module_path = _hooks_dir / "acli_helpers.py"
-_acli_spec = importlib.util.spec_from_file_location("acli_helpers", _acli_module_path)
-if _acli_spec and _acli_spec.loader:
-    _acli_mod = importlib.util.module_from_spec(_acli_spec)
-    _acli_spec.loader.exec_module(_acli_mod)
-    acli_succeeded = _acli_mod.acli_succeeded
-else:
-    raise ImportError(f"Could not load acli_helpers from {_acli_module_path}")
+import time
+from typing import Iterable, Optional
+
+# orjson is optional; stdlib json.loads accepts bytes too, so either works on
+# the raw stdin buffer. Both raise ValueError subclasses on bad input.
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# Shared helpers live in sibling modules (same directory). They are only needed
+# for Jira, so they're loaded on demand — as are subprocess and tempfile — to
+# keep the common early-exit path (wrong event, no issue key) cheap.
+_hooks_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def _load_sibling(name: str):
+    """Load a helper module from the hooks directory by file path."""
+    import importlib.util
+
+    module_path = os.path.join(_hooks_dir, f"{name}.py")
+    spec = importlib.util.spec_from_file_location(name, module_path)
+    if not (spec and spec.loader):
+        raise ImportError(f"Could not load {name} from {module_path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Compiled once at import; hooks fire on every PostToolUse so avoid re-resolving
+# the patterns through re's internal cache on each call.
+# Issue key path component (e.g., STA-123, ABC-45)
+_ISSUE_KEY_RE = re.compile(r"[A-Z]+-\d+")
+# Legacy answer format: User has answered your questions: "Question"="Answer"
+_ANSWERS_MARKER = "User has answered your questions:"
+# Fields are length-bounded so a malformed response can't drag the scan across
+# unbounded text. Questions are single-line; answers (e.g. free-text "Other"
+# replies) may span lines and get a much larger cap.
+_ANSWER_RE = re.compile(r'"([^"\n]{1,4096})"="([^"]{1,65536})"')
 
 
 def get_issue_key() -> Optional[str]:
@@ -56,16 +69,13 @@ def get_issue_key() -> Optional[str]:
         cwd = os.getcwd()
     except OSError:
         return None
-    parts = cwd.split("/")
 
-    # Look for Linear issue pattern (e.g., STA-123) in path components
-    for part in parts:
-        if part and "-" in part:
-            prefix = part.split("-")[0]
-            suffix = part.split("-", 1)[1] if "-" in part else ""
-            # Check if it looks like a Linear issue (e.g., STA-123, ABC-45)
-            if prefix.isupper() and prefix.isalpha() and suffix.isdigit():
-                return part
+    # Look for Linear issue pattern (e.g., STA-123) in path components. Scan
+    # from the root, like update-status.py, so both hooks agree on the issue
+    # when a path holds more than one key.
+    for part in cwd.split(os.sep):
+        if part and _ISSUE_KEY_RE.fullmatch(part):
+            return part
 
     return None
 
@@ -85,7 +95,9 @@ def format_question_answer(tool_input: dict, tool_response: dict | str) -> str:
     if not questions:
         return ""
 
-    lines = ["### 💬 Clarifying Question Answered", ""]
+    buf = io.StringIO()
+    w = buf.write
+    w("### 💬 Clarifying Question Answered\n\n")
 
     # Extract answers from the response
     answers_map = {}
@@ -94,17 +106,13 @@ def format_question_answer(tool_input: dict, tool_response: dict | str) -> str:
     if isinstance(tool_response, dict) and "answers" in tool_response:
         answers_map = tool_response.get("answers", {})
     # Legacy format: tool_response is a formatted string
-    elif isinstance(tool_response, str) and "User has answered your questions:" in tool_response:
-        # Extract the answers portion
-        answers_text = tool_response.split("User has answered your questions:")[1].strip()
-        # Parse key="value" pairs
-        import re
-
-        # Match patterns like "Question"="Answer"
-        pattern = r'"([^"]+)"="([^"]+)"'
-        matches = re.findall(pattern, answers_text)
-        for question_text, answer_text in matches:
-            answers_map[question_text] = answer_text
+    elif isinstance(tool_response, str):
+        # Parse key="value" pairs in place after the marker, without slicing
+        # off the answers portion first
+        idx = tool_response.find(_ANSWERS_MARKER)
+        if idx != -1:
+            for m in _ANSWER_RE.finditer(tool_response, idx + len(_ANSWERS_MARKER)):
+                answers_map[m.group(1)] = m.group(2)
 
     for q in questions:
         question_text = q.get("question", "Unknown question")
@@ -114,10 +122,9 @@ def format_question_answer(tool_input: dict, tool_response: dict | str) -> str:
 
         # Add question with header
         if header:
-            lines.append(f"❓ **{header}**: {question_text}")
+            w(f"❓ **{header}**: {question_text}\n\n")
         else:
-            lines.append(f"❓ {question_text}")
-        lines.append("")
+            w(f"❓ {question_text}\n\n")
 
         # Add options with indicators for selected answers
         answer = answers_map.get(question_text, "")
@@ -132,62 +139,78 @@ def format_question_answer(tool_input: dict, tool_response: dict | str) -> str:
                 marker = "✅ " if is_selected else ""
 
                 if description:
-                    lines.append(f"- {marker}{label}: {description}")
+                    w(f"- {marker}{label}: {description}\n")
                 else:
-                    lines.append(f"- {marker}{label}")
-            lines.append("")
+                    w(f"- {marker}{label}\n")
+            w("\n")
 
-        # If the answer doesn't match any option, it's a custom "Other" response
-        if answer and not any(opt.get("label") == answer for opt in options):
-            lines.append(f"💡 **Answer**: {answer}")
-        elif answer:
-            lines.append(f"💡 **Answer**: {answer}")
+        # Echo the answer text — for a custom "Other" response this is the only
+        # place it appears, and for a selected option it reads the same either way
+        if answer:
+            w(f"💡 **Answer**: {answer}\n")
 
-    return "\n".join(lines)
+    return buf.getvalue().rstrip("\n")
 
 
 def get_tracker_provider() -> str:
     """Get the issue tracker provider from .pappardelle.yml.
 
-    Uses regex-based parsing to avoid requiring PyYAML dependency.
+    Uses a line scanner to avoid requiring PyYAML dependency.
     Walks up from cwd to find the config file, then extracts the provider.
 
     Returns:
         "linear" (default) or "jira"
     """
-    # Walk up directories to find .pappardelle.yml
+    # Walk up directories to find .pappardelle.yml. Opening each candidate
+    # directly (instead of isfile + open) costs one syscall per level, and
+    # the loop ends naturally once dirname() stops changing at the root.
     try:
         current = os.getcwd()
     except OSError:
         return "linear"
-    config_path = None
-    for _ in range(20):  # max depth to prevent infinite loop
-        candidate = os.path.join(current, ".pappardelle.yml")
-        if os.path.isfile(candidate):
-            config_path = candidate
-            break
-        parent = os.path.dirname(current)
-        if parent == current:
-            break
-        current = parent
-
-    if not config_path:
-        return "linear"
+    while True:
+        try:
+            f = open(current + os.sep + ".pappardelle.yml", "rb")
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            parent = os.path.dirname(current)
+            if parent == current:
+                return "linear"
+            current = parent
+            continue
+        except OSError:
+            return "linear"
+        break
 
     try:
-        with open(config_path) as f:
-            content = f.read()
-        # Look for issue_tracker.provider value using regex
-        # Matches patterns like:
-        #   issue_tracker:
-        #     provider: jira
-        match = _re_module.search(r"issue_tracker:\s*\n\s+provider:\s*(\w+)", content)
-        if match:
-            return match.group(1).strip()
+        with f:
+            return _scan_tracker_provider(f) or "linear"
     except OSError:
-        pass
+        return "linear"
 
-    return "linear"
+
+def _scan_tracker_provider(lines: Iterable[bytes]) -> Optional[str]:
+    """Find issue_tracker.provider in .pappardelle.yml lines.
+
+    Single forward pass that stops at the provider line, or at the first
+    line dedented back to column 0 once inside the issue_tracker block, so
+    the rest of the file is never read. Matches patterns like:
+        issue_tracker:
+          provider: jira
+    """
+    in_block = False
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith(b"#"):
+            continue
+        if not in_block:
+            in_block = line.startswith(b"issue_tracker:")
+            continue
+        if not line[:1].isspace():
+            break  # left the issue_tracker block
+        if stripped.startswith(b"provider:"):
+            value = stripped[len(b"provider:") :].split(b"#", 1)[0].strip().strip(b"'\"")
+            return value.decode() or None
+    return None
 
 
 def post_comment(issue_key: str, body: str) -> bool:
@@ -203,9 +226,16 @@ def post_comment(issue_key: str, body: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
+    import subprocess
+
     provider = get_tracker_provider()
 
     if provider == "jira":
+        import tempfile
+
+        acli_succeeded = _load_sibling("acli_helpers").acli_succeeded
+        markdown_to_adf_json = _load_sibling("markdown_to_adf").markdown_to_adf_json
+
         # Convert markdown to ADF and write to temp file for --body-file
         adf_json = markdown_to_adf_json(body)
         tmp_path = None
@@ -231,11 +261,14 @@ def post_comment(issue_key: str, body: str) -> bool:
         not_found_msg = "linctl not found - install with: brew tap raegislabs/linctl && brew install linctl"
 
     try:
+        # close_fds=False is safe because Python 3 fds are non-inheritable by
+        # default (PEP 446), and it skips the per-fd close sweep in the child.
         result = subprocess.run(
             cmd,
             capture_output=True,
             text=True,
             timeout=30,
+            close_fds=False,
         )
         if provider == "jira":
             return acli_succeeded(result)
@@ -257,11 +290,50 @@ def post_comment(issue_key: str, body: str) -> bool:
                 pass
 
 
+def _detach() -> bool:
+    """Fork into a detached background child.
+
+    Returns True in the process that should carry on with the work: the
+    child, or the original process if forking isn't possible. Returns False
+    in the parent, which should exit immediately. The child starts a new
+    session and moves off the hook's pipes so Claude Code doesn't wait on it:
+    stdin/stdout go to /dev/null and stderr is appended to
+    ~/.pappardelle/logs/comment-hook.log, so posting failures still leave a
+    trace.
+    """
+    try:
+        pid = os.fork()
+    except (AttributeError, OSError):
+        return True
+    if pid:
+        return False
+
+    os.setsid()
+    devnull = os.open(os.devnull, os.O_RDWR)
+    try:
+        log_dir = os.path.join(os.path.expanduser("~"), ".pappardelle", "logs")
+        os.makedirs(log_dir, exist_ok=True)
+        err_fd = os.open(
+            os.path.join(log_dir, "comment-hook.log"),
+            os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+            0o644,
+        )
+    except OSError:
+        err_fd = devnull
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.dup2(err_fd, 2)
+    if err_fd != devnull:
+        os.close(err_fd)
+    os.close(devnull)
+    return True
+
+
 def main() -> None:
     # Read hook input from stdin
     try:
-        input_data = json.load(sys.stdin)
-    except json.JSONDecodeError:
+        input_data = _json_loads(sys.stdin.buffer.read())
+    except ValueError:
         sys.exit(0)  # Silent exit on invalid input
 
     # Only process PostToolUse events for AskUserQuestion
@@ -286,11 +358,18 @@ def main() -> None:
     if not comment_body:
         sys.exit(0)
 
+    # Hand the tracker round-trip to a background child so Claude isn't
+    # blocked on the network while the comment posts
+    if not _detach():
+        sys.exit(0)
+
     # Post to Linear
     success = post_comment(issue_key, comment_body)
     if not success:
         # Non-blocking error - just log and continue
-        print(f"Failed to post question/answer comment to {issue_key}", file=sys.stderr)
+        # Goes to the comment-hook log once detached (see _detach)
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        print(f"[{stamp}] Failed to post question/answer comment to {issue_key}", file=sys.stderr)
 
     sys.exit(0)
 
@@ -0,0 +1,38 @@
+"""Shared pytest helpers for the hook tests."""
+
+import functools
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+_HOOKS_DIR = Path(__file__).parent
+
+
+@functools.lru_cache(maxsize=None)
+def load_hook(name: str):
+    """Load a hook script or helper module from this directory by file name.
+
+    Hook scripts have hyphens in their names, so they can't be imported
+    normally. The module is registered in sys.modules under its underscored
+    name and cached here, so each file is executed once per test session no
+    matter how many test files load it.
+    """
+    module_name = name.replace("-", "_")
+    module_path = _HOOKS_DIR / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    assert spec is not None, f"Failed to load {module_path.name} spec"
+    assert spec.loader is not None, f"Failed to get loader for {module_path.name}"
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def jira_config_dir(tmp_path_factory):
+    """Read-only directory holding a .pappardelle.yml that selects Jira."""
+    d = tmp_path_factory.mktemp("jira_cfg")
+    (d / ".pappardelle.yml").write_text("issue_tracker:\n  provider: jira\n")
+    return d
@@ -5,18 +5,11 @@ Tests for acli_helpers.py shared module.
 Run with: uv run pytest hooks/test_acli_helpers.py -v
 """
 
-import importlib.util
-import sys
-from pathlib import Path
 from unittest.mock import MagicMock
 
-_module_path = Path(__file__).parent / "acli_helpers.py"
-_spec = importlib.util.spec_from_file_location("acli_helpers", _module_path)
-assert _spec is not None
-assert _spec.loader is not None
-mod = importlib.util.module_from_spec(_spec)
-sys.modules["acli_helpers"] = mod
-_spec.loader.exec_module(mod)
+from conftest import load_hook
+
+mod = load_hook("acli_helpers")
 
 acli_succeeded = mod.acli_succeeded
 
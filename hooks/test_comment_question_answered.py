@@ -5,23 +5,19 @@ Tests for comment-question-answered.py hook script — Jira ADF integration path
 Run with: uv run pytest hooks/test_comment_question_answered.py -v
 """
 
-import importlib.util
 import json
 import os
 import subprocess
 import sys
-from pathlib import Path
+import time
+from io import BytesIO, TextIOWrapper
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-_module_path = Path(__file__).parent / "comment-question-answered.py"
-_spec = importlib.util.spec_from_file_location("comment_question_answered", _module_path)
-assert _spec is not None
-assert _spec.loader is not None
-mod = importlib.util.module_from_spec(_spec)
-sys.modules["comment_question_answered"] = mod
-_spec.loader.exec_module(mod)
+from conftest import load_hook
+
+mod = load_hook("comment-question-answered")
 
 get_issue_key = mod.get_issue_key
 get_tracker_provider = mod.get_tracker_provider
@@ -29,37 +25,85 @@ format_question_answer = mod.format_question_answer
 post_comment = mod.post_comment
 
 
-class TestGetIssueKey:
-    def test_extracts_from_worktree_path(self):
-        with patch("os.getcwd", return_value="/Users/x/.worktrees/repo/STA-123/src"):
-            assert get_issue_key() == "STA-123"
+def _raise_file_not_found():
+    raise FileNotFoundError
 
-    def test_returns_none_for_no_issue(self):
-        with patch("os.getcwd", return_value="/Users/x/projects/my-repo"):
-            assert get_issue_key() is None
 
-    def test_returns_none_when_getcwd_raises_oserror(self):
+class TestGetIssueKey:
+    def test_extracts_from_worktree_path(self, monkeypatch):
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/x/.worktrees/repo/STA-123/src")
+        assert get_issue_key() == "STA-123"
+
+    def test_prefers_component_closest_to_root(self, monkeypatch):
+        """Matches update-status.py's workspace name for paths holding two keys."""
+        path = "/Users/x/ABC-1/.worktrees/repo/STA-123/src"
+        monkeypatch.setattr(os, "getcwd", lambda: path)
+        assert get_issue_key() == "ABC-1"
+        assert load_hook("update-status").get_workspace_name(cwd=path) == "ABC-1"
+
+    def test_ignores_lowercase_prefix(self, monkeypatch):
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/x/.worktrees/repo/sta-123")
+        assert get_issue_key() is None
+
+    def test_returns_none_for_no_issue(self, monkeypatch):
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/x/projects/my-repo")
+        assert get_issue_key() is None
+
+    def test_returns_none_when_getcwd_raises_oserror(self, monkeypatch):
         """Should return None when os.getcwd() raises (deleted worktree)."""
-        with patch("os.getcwd", side_effect=FileNotFoundError):
-            assert get_issue_key() is None
+        monkeypatch.setattr(os, "getcwd", _raise_file_not_found)
+        assert get_issue_key() is None
 
 
 class TestGetTrackerProvider:
-    def test_returns_jira_from_config(self, tmp_path):
+    def test_returns_jira_from_config(self, jira_config_dir, monkeypatch):
+        monkeypatch.setattr(os, "getcwd", lambda: str(jira_config_dir))
+        assert get_tracker_provider() == "jira"
+
+    def test_finds_provider_after_other_keys_in_block(self, tmp_path, monkeypatch):
+        config = tmp_path / ".pappardelle.yml"
+        config.write_text(
+            "team_prefix: PROJ\n"
+            "issue_tracker:\n"
+            "  base_url: https://example.atlassian.net\n"
+            "\n"
+            "  provider: 'jira'  # switched from linear\n"
+        )
+
+        monkeypatch.setattr(os, "getcwd", lambda: str(tmp_path))
+        assert get_tracker_provider() == "jira"
+
+    def test_ignores_provider_outside_issue_tracker_block(self, tmp_path, monkeypatch):
         config = tmp_path / ".pappardelle.yml"
-        config.write_text("issue_tracker:\n  provider: jira\n")
+        config.write_text("issue_tracker:\n  base_url: https://x\nvcs:\n  provider: gitlab\n")
+
+        monkeypatch.setattr(os, "getcwd", lambda: str(tmp_path))
+        assert get_tracker_provider() == "linear"
 
-        with patch("os.getcwd", return_value=str(tmp_path)):
-            assert get_tracker_provider() == "jira"
+    def test_finds_config_in_ancestor_dir(self, tmp_path, monkeypatch):
+        (tmp_path / ".pappardelle.yml").write_text("issue_tracker:\n  provider: jira\n")
+        nested = tmp_path / "STA-123" / "src"
+        nested.mkdir(parents=True)
 
-    def test_returns_linear_by_default(self, tmp_path):
-        with patch("os.getcwd", return_value=str(tmp_path)):
-            assert get_tracker_provider() == "linear"
+        monkeypatch.setattr(os, "getcwd", lambda: str(nested))
+        assert get_tracker_provider() == "jira"
 
-    def test_returns_linear_when_getcwd_raises_oserror(self):
+    def test_skips_directory_named_like_config(self, tmp_path, monkeypatch):
+        (tmp_path / ".pappardelle.yml").write_text("issue_tracker:\n  provider: jira\n")
+        nested = tmp_path / "repo"
+        (nested / ".pappardelle.yml").mkdir(parents=True)
+
+        monkeypatch.setattr(os, "getcwd", lambda: str(nested))
+        assert get_tracker_provider() == "jira"
+
+    def test_returns_linear_by_default(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(os, "getcwd", lambda: str(tmp_path))
+        assert get_tracker_provider() == "linear"
+
+    def test_returns_linear_when_getcwd_raises_oserror(self, monkeypatch):
         """Should return 'linear' default when os.getcwd() raises (deleted worktree)."""
-        with patch("os.getcwd", side_effect=FileNotFoundError):
-            assert get_tracker_provider() == "linear"
+        monkeypatch.setattr(os, "getcwd", _raise_file_not_found)
+        assert get_tracker_provider() == "linear"
 
 
 class TestFormatQuestionAnswer:
@@ -100,6 +144,19 @@ class TestFormatQuestionAnswer:
         assert "Which approach?" in result
         assert "Option A" in result
 
+    def test_legacy_multiline_answer_is_captured(self):
+        tool_input = {"questions": [{"question": "Q1", "options": []}, {"question": "Q2", "options": []}]}
+        tool_response = 'User has answered your questions: "Q1"="first line\nsecond line" "Q2"="Yes"'
+        result = format_question_answer(tool_input, tool_response)
+        assert "first line\nsecond line" in result
+        assert "💡 **Answer**: Yes" in result
+
+    def test_legacy_answer_longer_than_question_cap_is_captured(self):
+        tool_input = {"questions": [{"question": "Q1", "options": []}]}
+        answer = "x" * 10_000
+        tool_response = f'User has answered your questions: "Q1"="{answer}"'
+        assert answer in format_question_answer(tool_input, tool_response)
+
     def test_returns_empty_when_no_questions(self):
         assert format_question_answer({}, {}) == ""
         assert format_question_answer({"questions": []}, {}) == ""
@@ -109,18 +166,18 @@ class TestPostCommentJira:
     def test_calls_acli_with_body_file(self):
         with (
             patch.object(mod, "get_tracker_provider", return_value="jira"),
-            patch.object(mod, "subprocess") as mock_subprocess,
+            patch("subprocess.run") as mock_run,
         ):
             mock_result = MagicMock()
             mock_result.returncode = 0
             mock_result.stdout = "Comment added"
             mock_result.stderr = ""
-            mock_subprocess.run.return_value = mock_result
+            mock_run.return_value = mock_result
 
             result = post_comment("PROJ-1", "## Q&A\n\nSome answer")
 
             assert result is True
-            call_args = mock_subprocess.run.call_args
+            call_args = mock_run.call_args
             cmd = call_args[0][0]
             assert "acli" in cmd
             assert "--body-file" in cmd
@@ -143,9 +200,9 @@ class TestPostCommentJira:
 
         with (
             patch.object(mod, "get_tracker_provider", return_value="jira"),
-            patch.object(mod, "subprocess") as mock_subprocess,
+            patch("subprocess.run") as mock_run,
         ):
-            mock_subprocess.run.side_effect = capture_run
+            mock_run.side_effect = capture_run
 
             post_comment("PROJ-1", "### Heading\n\n**bold** text")
 
@@ -157,7 +214,7 @@ class TestPostCommentJira:
     def test_temp_file_cleaned_up_on_success(self):
         with (
             patch.object(mod, "get_tracker_provider", return_value="jira"),
-            patch.object(mod, "subprocess") as mock_subprocess,
+            patch("subprocess.run") as mock_run,
         ):
             captured_path = []
 
@@ -170,7 +227,7 @@ class TestPostCommentJira:
                 result.stderr = ""
                 return result
 
-            mock_subprocess.run.side_effect = capture_run
+            mock_run.side_effect = capture_run
 
             post_comment("PROJ-1", "Comment body")
 
@@ -180,7 +237,7 @@ class TestPostCommentJira:
     def test_temp_file_cleaned_up_on_timeout(self):
         with (
             patch.object(mod, "get_tracker_provider", return_value="jira"),
-            patch.object(mod, "subprocess") as mock_subprocess,
+            patch("subprocess.run") as mock_run,
         ):
             captured_path = []
 
@@ -189,8 +246,7 @@ class TestPostCommentJira:
                 captured_path.append(cmd[body_idx])
                 raise subprocess.TimeoutExpired(cmd=cmd, timeout=30)
 
-            mock_subprocess.run.side_effect = capture_run
-            mock_subprocess.TimeoutExpired = subprocess.TimeoutExpired
+            mock_run.side_effect = capture_run
 
             result = post_comment("PROJ-1", "Comment body")
 
@@ -201,13 +257,13 @@ class TestPostCommentJira:
     def test_returns_false_on_acli_failure_output(self):
         with (
             patch.object(mod, "get_tracker_provider", return_value="jira"),
-            patch.object(mod, "subprocess") as mock_subprocess,
+            patch("subprocess.run") as mock_run,
         ):
             mock_result = MagicMock()
             mock_result.returncode = 0
             mock_result.stdout = "Failure: invalid ADF"
             mock_result.stderr = ""
-            mock_subprocess.run.return_value = mock_result
+            mock_run.return_value = mock_result
 
             result = post_comment("PROJ-1", "Comment body")
 
@@ -216,9 +272,8 @@ class TestPostCommentJira:
     def test_returns_false_on_tempfile_error(self):
         with (
             patch.object(mod, "get_tracker_provider", return_value="jira"),
-            patch.object(mod, "tempfile") as mock_tempfile,
+            patch("tempfile.NamedTemporaryFile", side_effect=OSError("disk full")),
         ):
-            mock_tempfile.NamedTemporaryFile.side_effect = OSError("disk full")
 
             result = post_comment("PROJ-1", "Comment body")
 
@@ -229,20 +284,105 @@ class TestPostCommentLinear:
     def test_calls_linctl_with_body(self):
         with (
             patch.object(mod, "get_tracker_provider", return_value="linear"),
-            patch.object(mod, "subprocess") as mock_subprocess,
+            patch("subprocess.run") as mock_run,
         ):
             mock_result = MagicMock()
             mock_result.returncode = 0
-            mock_subprocess.run.return_value = mock_result
+            mock_run.return_value = mock_result
 
             result = post_comment("STA-123", "Comment body")
 
             assert result is True
-            call_args = mock_subprocess.run.call_args
+            call_args = mock_run.call_args
             cmd = call_args[0][0]
             assert "linctl" in cmd
             assert "--body" in cmd
             assert "Comment body" in cmd
+            assert call_args.kwargs["close_fds"] is False
+
+
+class TestDetach:
+    def test_parent_returns_false(self):
+        with patch("os.fork", return_value=4242), patch("os.setsid") as mock_setsid:
+            assert mod._detach() is False
+        mock_setsid.assert_not_called()
+
+    def test_runs_inline_when_fork_fails(self):
+        with patch("os.fork", side_effect=OSError), patch("os.setsid") as mock_setsid:
+            assert mod._detach() is True
+        mock_setsid.assert_not_called()
+
+    def test_child_appends_stderr_to_log(self, tmp_path):
+        """The real fork: the parent returns without holding the hook's pipes,
+        and whatever the child writes to stderr lands in comment-hook.log."""
+        log_file = tmp_path / ".pappardelle" / "logs" / "comment-hook.log"
+        log_file.parent.mkdir(parents=True)
+        log_file.write_text("earlier entry\n")
+        script = (
+            "import importlib.util, sys, time\n"
+            f"spec = importlib.util.spec_from_file_location('hook', {mod.__file__!r})\n"
+            "hook = importlib.util.module_from_spec(spec)\n"
+            "spec.loader.exec_module(hook)\n"
+            "if not hook._detach():\n"
+            "    sys.exit(0)\n"
+            "print('to stdout')\n"
+            "print('posting failed', file=sys.stderr)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            env={**os.environ, "HOME": str(tmp_path)},
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        assert result.returncode == 0
+        assert result.stdout == ""
+        assert result.stderr == ""
+
+        # capture_output waits for every writer of the pipes to close, so the
+        # child has already moved off them; give it time to write the log.
+        deadline = time.monotonic() + 10
+        while "posting failed" not in log_file.read_text() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert log_file.read_text() == "earlier entry\nposting failed\n"
+
+
+class TestMain:
+    _INPUT = {
+        "hook_event_name": "PostToolUse",
+        "tool_name": "AskUserQuestion",
+        "tool_input": {"questions": [{"question": "Which approach?", "options": []}]},
+        "tool_response": {"answers": {"Which approach?": "Option A"}},
+    }
+
+    def _run_main(self, monkeypatch, detached_child: bool) -> MagicMock:
+        mock_post = MagicMock(return_value=True)
+        monkeypatch.setattr(sys, "stdin", TextIOWrapper(BytesIO(json.dumps(self._INPUT).encode())))
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/x/.worktrees/repo/STA-123")
+        monkeypatch.setattr(mod, "_detach", lambda: detached_child)
+        monkeypatch.setattr(mod, "post_comment", mock_post)
+        with pytest.raises(SystemExit) as exc_info:
+            mod.main()
+        assert exc_info.value.code == 0
+        return mock_post
+
+    def test_exits_silently_on_invalid_json(self, monkeypatch):
+        mock_post = MagicMock()
+        monkeypatch.setattr(sys, "stdin", TextIOWrapper(BytesIO(b"not json")))
+        monkeypatch.setattr(mod, "post_comment", mock_post)
+        with pytest.raises(SystemExit) as exc_info:
+            mod.main()
+        assert exc_info.value.code == 0
+        mock_post.assert_not_called()
+
+    def test_parent_exits_without_posting(self, monkeypatch):
+        mock_post = self._run_main(monkeypatch, detached_child=False)
+        mock_post.assert_not_called()
+
+    def test_child_posts_comment(self, monkeypatch):
+        mock_post = self._run_main(monkeypatch, detached_child=True)
+        mock_post.assert_called_once()
+        assert mock_post.call_args[0][0] == "STA-123"
 
 
 class TestMainExitsZero:
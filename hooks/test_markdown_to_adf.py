@@ -6,19 +6,13 @@ Run with: uv run pytest hooks/test_markdown_to_adf.py -v
 Or from hooks dir: python3 -m pytest test_markdown_to_adf.py -v
 """
 
-import importlib.util
 import json
 import subprocess
 import sys
-from pathlib import Path
 
-_module_path = Path(__file__).parent / "markdown_to_adf.py"
-_spec = importlib.util.spec_from_file_location("markdown_to_adf", _module_path)
-assert _spec is not None
-assert _spec.loader is not None
-mod = importlib.util.module_from_spec(_spec)
-sys.modules["markdown_to_adf"] = mod
-_spec.loader.exec_module(mod)
+from conftest import load_hook
+
+mod = load_hook("markdown_to_adf")
 
 markdown_to_adf = mod.markdown_to_adf
 markdown_to_adf_json = mod.markdown_to_adf_json
@@ -291,7 +285,7 @@ class TestJsonOutput:
 
 class TestCLIMode:
     def test_stdin_mode(self):
-        script = str(_module_path)
+        script = mod.__file__
         result = subprocess.run(
             [sys.executable, script],
             input="## Hello\n\nWorld",
@@ -304,7 +298,7 @@ class TestCLIMode:
         assert parsed["content"][0]["type"] == "paragraph"  # heading -> bold paragraph
 
     def test_argument_mode(self):
-        script = str(_module_path)
+        script = mod.__file__
         result = subprocess.run(
             [sys.executable, script, "## Test"],
             capture_output=True,
@@ -6,195 +6,328 @@ Uses pytest to verify the status determination logic for various Claude hook eve
 Run with: uv run pytest _dev/scripts/pappardelle/hooks/test_update_status.py -v
 """
 
-# Import the module under test (has hyphen in filename, so use importlib)
-import importlib.util
+import builtins
 import json
+import os
+import re
+import subprocess
 import sys
+from io import BytesIO, TextIOWrapper
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Any, Optional
-from unittest.mock import patch
 
 import pytest
 
-_module_path = Path(__file__).parent / "update-status.py"
-_spec = importlib.util.spec_from_file_location("update_status", _module_path)
-assert _spec is not None, "Failed to load update-status.py spec"
-assert _spec.loader is not None, "Failed to get loader for update-status.py"
-update_status_module = importlib.util.module_from_spec(_spec)
-sys.modules["update_status"] = update_status_module
-_spec.loader.exec_module(update_status_module)
+from conftest import load_hook
+
+update_status_module = load_hook("update-status")
+us = update_status_module
 
 get_workspace_name = update_status_module.get_workspace_name
 update_status = update_status_module.update_status
 get_status_dir = update_status_module.get_status_dir
 
+# Stand-in for a failed subprocess.run result
+_FAIL = SimpleNamespace(returncode=1, stdout="")
+
+# Empty hook payload for argv-driven runs; wrap in a fresh stream per test
+# since a shared stream would be exhausted after the first read
+_EMPTY_STDIN_TEXT = "{}"
+
+
+def _stdin(text: str) -> TextIOWrapper:
+    """Build a stdin stand-in; the hook reads raw bytes from sys.stdin.buffer."""
+    return TextIOWrapper(BytesIO(text.encode()))
+
+
+_MEMOIZED = (us._git, us.get_workspace_name, us.get_status_dir)
+
+
+@pytest.fixture(autouse=True)
+def _clear_memoized_lookups():
+    """Drop memoized lookups so each test sees its own getcwd/git/env mocks."""
+    for fn in _MEMOIZED:
+        fn.cache_clear()
+    yield
+    for fn in _MEMOIZED:
+        fn.cache_clear()
+
+
+class FakeGit:
+    """Configurable stand-in for subprocess.run answering git rev-parse.
+
+    Leave branch/top as None to make that part of the lookup fail; like real
+    git, a failed --show-toplevel still prints the branch before exiting 1.
+    """
+
+    def __init__(self) -> None:
+        self.branch: Optional[str] = None
+        self.top: Optional[str] = None
+        self.calls: list[list[str]] = []
+        self.cwds: list[Optional[str]] = []
+
+    def __call__(self, cmd, **kwargs):
+        self.calls.append(cmd)
+        self.cwds.append(kwargs.get("cwd"))
+        if cmd[:2] != ["git", "rev-parse"] or not self.branch:
+            return _FAIL
+        if "--show-toplevel" in cmd and not self.top:
+            return SimpleNamespace(returncode=1, stdout=self.branch)
+        return SimpleNamespace(returncode=0, stdout=self.branch + (self.top or ""))
+
+
+_real_read_git_head = us._read_git_head
+
+
+@pytest.fixture
+def fake_git(monkeypatch) -> FakeGit:
+    """Answer git from a FakeGit and keep the .git/HEAD walk off the real disk.
+
+    The fake cwds used in tests (e.g. /Users/charlie/cs/stardust-labs) may be
+    real checkouts on a developer's machine; tests exercising the HEAD reader
+    restore it explicitly and build their repos under tmp_path.
+    """
+    fg = FakeGit()
+    monkeypatch.setattr(subprocess, "run", fg)
+    monkeypatch.setattr(us, "_read_git_head", lambda cwd: None)
+    return fg
+
+
+@pytest.fixture
+def status_file(tmp_path) -> Path:
+    """Status file the hook writes for the STA-999 worktree cwd used below."""
+    return tmp_path / "STA-999.json"
+
+
+def _load(path: Path) -> Any:
+    """Read back a written status file."""
+    return json.loads(path.read_bytes())
+
+
+def _create_hook_input(
+    hook_event: str,
+    tool_name: Optional[str] = None,
+    notification_type: Optional[str] = None,
+    session_id: str = "test-session",
+    cwd: str = "/Users/charlie/.worktrees/stardust-labs/STA-999",
+) -> dict[str, Any]:
+    """Helper to create hook input dict."""
+    data: dict[str, Any] = {
+        "hook_event_name": hook_event,
+        "session_id": session_id,
+        "cwd": cwd,
+    }
+    if tool_name:
+        data["tool_name"] = tool_name
+    if notification_type:
+        data["notification_type"] = notification_type
+    return data
+
+
+# (hook_event, tool_name, notification_type, expected status or None if no write)
+_EVENT_CASES = [
+    ("UserPromptSubmit", None, None, "processing"),
+    ("PreToolUse", "Bash", None, "running_tool"),
+    # PostToolUse sets 'processing' for all tools uniformly
+    ("PostToolUse", "Read", None, "processing"),
+    # No AskUserQuestion special-casing (Claude Island model)
+    ("PostToolUse", "AskUserQuestion", None, "processing"),
+    ("PermissionRequest", "Bash", None, "waiting_for_approval"),
+    ("PermissionRequest", "AskUserQuestion", None, "waiting_for_approval"),
+    # Claude finished turn, session still active
+    ("Stop", None, None, "waiting_for_input"),
+    ("SessionStart", None, None, "waiting_for_input"),
+    # Distinct from waiting_for_input
+    ("SessionEnd", None, None, "ended"),
+    # Parent back to waiting
+    ("SubagentStop", None, None, "waiting_for_input"),
+    ("PreCompact", None, None, "compacting"),
+    ("Notification", None, "idle_prompt", "waiting_for_input"),
+    # PermissionRequest handles permission prompts
+    ("Notification", None, "permission_prompt", None),
+    ("Notification", None, "some_other_type", None),
+    ("SomeUnknownEvent", None, None, None),
+]
+
+# Hook payloads for the event table, serialized once at import
+_SERIALIZED_INPUTS = {
+    (event, tool, ntype): json.dumps(_create_hook_input(event, tool, ntype)) for event, tool, ntype, _ in _EVENT_CASES
+}
+
 
 class TestGetWorkspaceName:
     """Tests for workspace name extraction from cwd."""
 
-    def test_extracts_linear_issue_from_worktree_path(self):
+    def test_extracts_linear_issue_from_worktree_path(self, monkeypatch):
         """Should extract STA-123 from ~/.worktrees/stardust-labs/STA-123/..."""
-        with patch("os.getcwd", return_value="/Users/charlie/.worktrees/stardust-labs/STA-123/hooks"):
-            assert get_workspace_name() == "STA-123"
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/.worktrees/stardust-labs/STA-123/hooks")
+        assert get_workspace_name() == "STA-123"
 
-    def test_extracts_linear_issue_with_different_prefix(self):
+    def test_extracts_linear_issue_with_different_prefix(self, monkeypatch):
         """Should extract ABC-45 from path with different prefix."""
-        with patch("os.getcwd", return_value="/home/user/.worktrees/repo/ABC-45"):
-            assert get_workspace_name() == "ABC-45"
+        monkeypatch.setattr(os, "getcwd", lambda: "/home/user/.worktrees/repo/ABC-45")
+        assert get_workspace_name() == "ABC-45"
+
+    def test_worktree_pattern_is_precompiled(self):
+        """The issue-key pattern is compiled once at import."""
+        assert isinstance(us._WORKTREE_RE, re.Pattern)
+
+    def test_extracts_issue_from_leading_component_of_relative_cwd(self):
+        """A relative cwd whose first component is the issue key still matches."""
+        assert get_workspace_name(cwd="STA-321/src") == "STA-321"
 
-    def test_returns_unknown_when_getcwd_raises_oserror(self):
+    def test_does_not_match_issue_key_embedded_in_component(self, monkeypatch, fake_git):
+        """A component like feature-STA-123 is not an issue worktree."""
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/cs/feature-STA-123")
+        assert get_workspace_name() == "unknown"
+
+    def test_returns_unknown_when_getcwd_raises_oserror(self, monkeypatch):
         """Should return 'unknown' when os.getcwd() raises (deleted worktree)."""
-        with patch("os.getcwd", side_effect=FileNotFoundError):
-            assert get_workspace_name() == "unknown"
 
-    def test_uses_explicit_cwd_parameter(self):
+        def raise_not_found():
+            raise FileNotFoundError
+
+        monkeypatch.setattr(os, "getcwd", raise_not_found)
+        assert get_workspace_name() == "unknown"
+
+    def test_uses_explicit_cwd_parameter(self, monkeypatch):
         """Should use provided cwd without calling os.getcwd()."""
-        with patch("os.getcwd") as mock_getcwd:
-            result = get_workspace_name(cwd="/Users/x/.worktrees/repo/STA-456")
-            assert result == "STA-456"
-            mock_getcwd.assert_not_called()
+        getcwd_calls = []
+        monkeypatch.setattr(os, "getcwd", lambda: getcwd_calls.append(1) or "/")
+        result = get_workspace_name(cwd="/Users/x/.worktrees/repo/STA-456")
+        assert result == "STA-456"
+        assert getcwd_calls == []
 
-    def test_explicit_cwd_none_falls_back_to_getcwd(self):
+    def test_explicit_cwd_none_falls_back_to_getcwd(self, monkeypatch):
         """When cwd is None, should fall back to os.getcwd()."""
-        with patch("os.getcwd", return_value="/Users/x/.worktrees/repo/STA-789"):
-            assert get_workspace_name(cwd=None) == "STA-789"
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/x/.worktrees/repo/STA-789")
+        assert get_workspace_name(cwd=None) == "STA-789"
 
-    def test_returns_unknown_for_non_worktree_path_without_git(self):
+    def test_returns_unknown_for_non_worktree_path_without_git(self, monkeypatch, fake_git):
         """Should return 'unknown' when not in a worktree path and git fails."""
-        with (
-            patch("os.getcwd", return_value="/Users/charlie/projects/some-repo"),
-            patch(
-                "subprocess.run",
-                return_value=type("Result", (), {"returncode": 1, "stdout": ""})(),
-            ),
-        ):
-            assert get_workspace_name() == "unknown"
-
-    def test_returns_unknown_for_lowercase_prefix_without_git(self):
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/projects/some-repo")
+        assert get_workspace_name() == "unknown"
+
+    def test_returns_unknown_for_lowercase_prefix_without_git(self, monkeypatch, fake_git):
         """Should not match lowercase prefixes like sta-123 and git fails."""
-        with (
-            patch("os.getcwd", return_value="/Users/charlie/.worktrees/stardust-labs/sta-123"),
-            patch(
-                "subprocess.run",
-                return_value=type("Result", (), {"returncode": 1, "stdout": ""})(),
-            ),
-        ):
-            assert get_workspace_name() == "unknown"
-
-    def test_detects_main_worktree_via_git_branch(self):
-        """When in main worktree (no issue key in path), should use repo-qualified name."""
-
-        def mock_run(cmd, **kwargs):
-            if "--abbrev-ref" in cmd:
-                return type("Result", (), {"returncode": 0, "stdout": "master\n"})()
-            if "--show-toplevel" in cmd:
-                return type("Result", (), {"returncode": 0, "stdout": "/Users/charlie/cs/stardust-labs\n"})()
-            return type("Result", (), {"returncode": 1, "stdout": ""})()
-
-        with (
-            patch("os.getcwd", return_value="/Users/charlie/cs/stardust-labs"),
-            patch("subprocess.run", side_effect=mock_run),
-        ):
-            assert get_workspace_name() == "stardust-labs-master"
-
-    def test_detects_main_branch_named_main(self):
-        """Should include repo name for 'main' branches too."""
-
-        def mock_run(cmd, **kwargs):
-            if "--abbrev-ref" in cmd:
-                return type("Result", (), {"returncode": 0, "stdout": "main\n"})()
-            if "--show-toplevel" in cmd:
-                return type("Result", (), {"returncode": 0, "stdout": "/Users/charlie/cs/some-repo\n"})()
-            return type("Result", (), {"returncode": 1, "stdout": ""})()
-
-        with (
-            patch("os.getcwd", return_value="/Users/charlie/cs/some-repo"),
-            patch("subprocess.run", side_effect=mock_run),
-        ):
-            assert get_workspace_name() == "some-repo-main"
-
-    def test_detects_arbitrary_branch_name(self):
-        """Should include repo name for any branch."""
-
-        def mock_run(cmd, **kwargs):
-            if "--abbrev-ref" in cmd:
-                return type("Result", (), {"returncode": 0, "stdout": "foo\n"})()
-            if "--show-toplevel" in cmd:
-                return type("Result", (), {"returncode": 0, "stdout": "/Users/charlie/cs/some-repo\n"})()
-            return type("Result", (), {"returncode": 1, "stdout": ""})()
-
-        with (
-            patch("os.getcwd", return_value="/Users/charlie/cs/some-repo"),
-            patch("subprocess.run", side_effect=mock_run),
-        ):
-            assert get_workspace_name() == "some-repo-foo"
-
-    def test_returns_unknown_when_git_fails(self):
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/.worktrees/stardust-labs/sta-123")
+        assert get_workspace_name() == "unknown"
+
+    @pytest.mark.parametrize(
+        "branch,top,expected",
+        [
+            # Main worktree: repo-qualified name to avoid collisions across repos
+            ("master\n", "/Users/charlie/cs/stardust-labs\n", "stardust-labs-master"),
+            ("main\n", "/Users/charlie/cs/some-repo\n", "some-repo-main"),
+            ("foo\n", "/Users/charlie/cs/some-repo\n", "some-repo-foo"),
+            # show-toplevel fails: fall back to branch only
+            ("main\n", None, "main"),
+        ],
+    )
+    def test_detects_main_worktree_via_git_branch(self, monkeypatch, fake_git, branch, top, expected):
+        """When in main worktree (no issue key in path), should use repo-qualified branch name."""
+        fake_git.branch, fake_git.top = branch, top
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/cs/some-repo")
+        assert get_workspace_name() == expected
+
+    def test_returns_unknown_when_git_fails(self, monkeypatch, fake_git):
         """If git command fails, should still return 'unknown'."""
-        with (
-            patch("os.getcwd", return_value="/Users/charlie/cs/stardust-labs"),
-            patch(
-                "subprocess.run",
-                return_value=type("Result", (), {"returncode": 1, "stdout": ""})(),
-            ),
-        ):
-            assert get_workspace_name() == "unknown"
-
-    def test_falls_back_to_branch_only_when_toplevel_fails(self):
-        """If git show-toplevel fails but branch succeeds, fall back to branch only."""
-
-        def mock_run(cmd, **kwargs):
-            if "--abbrev-ref" in cmd:
-                return type("Result", (), {"returncode": 0, "stdout": "main\n"})()
-            if "--show-toplevel" in cmd:
-                return type("Result", (), {"returncode": 1, "stdout": ""})()
-            return type("Result", (), {"returncode": 1, "stdout": ""})()
-
-        with (
-            patch("os.getcwd", return_value="/Users/charlie/cs/some-repo"),
-            patch("subprocess.run", side_effect=mock_run),
-        ):
-            assert get_workspace_name() == "main"
-
-    def test_main_worktree_status_writes_to_repo_qualified_file(self, tmp_path):
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/cs/stardust-labs")
+        assert get_workspace_name() == "unknown"
+
+    def test_git_lookups_are_memoized(self, monkeypatch, fake_git):
+        """Repeated lookups in one process should not spawn git again."""
+        fake_git.branch, fake_git.top = "main\n", "/Users/charlie/cs/some-repo\n"
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/cs/some-repo")
+        assert get_workspace_name() == "some-repo-main"
+        assert get_workspace_name() == "some-repo-main"
+        assert len(fake_git.calls) == 1
+
+    def test_resolves_branch_and_toplevel_in_one_git_call(self, monkeypatch, fake_git):
+        """Branch and repo root come from a single rev-parse invocation."""
+        fake_git.branch, fake_git.top = "main\n", "/Users/charlie/cs/some-repo\n"
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/cs/some-repo")
+        assert get_workspace_name() == "some-repo-main"
+        assert fake_git.calls == [["git", "rev-parse", "--abbrev-ref", "HEAD", "--show-toplevel"]]
+
+    def test_failed_rev_parse_echoing_head_is_not_a_branch(self, monkeypatch, fake_git):
+        """An unborn branch makes rev-parse exit 128 yet still print HEAD."""
+        monkeypatch.setattr(subprocess, "run", lambda cmd, **kwargs: SimpleNamespace(returncode=128, stdout="HEAD\n"))
+        assert get_workspace_name(cwd="/Users/charlie/cs/orphan") == "unknown"
+
+    def test_git_runs_in_the_resolved_cwd(self, fake_git):
+        """git must inspect the same directory the path checks used, not the process cwd."""
+        fake_git.branch, fake_git.top = "main\n", "/Users/charlie/cs/other-repo\n"
+        assert get_workspace_name(cwd="/Users/charlie/cs/other-repo") == "other-repo-main"
+        assert fake_git.cwds == ["/Users/charlie/cs/other-repo"]
+
+    def test_reads_branch_from_git_head_without_spawning_git(self, tmp_path, monkeypatch, fake_git):
+        """A plain checkout resolves from .git/HEAD in an ancestor directory."""
+        monkeypatch.setattr(us, "_read_git_head", _real_read_git_head)
+        repo = tmp_path / "some-repo"
+        (repo / ".git").mkdir(parents=True)
+        (repo / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+        (repo / "src").mkdir()
+
+        assert get_workspace_name(cwd=str(repo / "src")) == "some-repo-main"
+        assert fake_git.calls == []
+
+    def test_detached_head_falls_back_to_git(self, tmp_path, monkeypatch, fake_git):
+        monkeypatch.setattr(us, "_read_git_head", _real_read_git_head)
+        repo = tmp_path / "some-repo"
+        (repo / ".git").mkdir(parents=True)
+        (repo / ".git" / "HEAD").write_text("0123456789abcdef0123456789abcdef01234567\n")
+        fake_git.branch, fake_git.top = "HEAD\n", f"{repo}\n"
+
+        assert get_workspace_name(cwd=str(repo)) == "some-repo-HEAD"
+        assert len(fake_git.calls) == 1
+
+    def test_reftable_stub_head_falls_back_to_git(self, tmp_path, monkeypatch, fake_git):
+        """Reftable repos keep a stub .git/HEAD; the real branch comes from git."""
+        monkeypatch.setattr(us, "_read_git_head", _real_read_git_head)
+        repo = tmp_path / "myrepo"
+        (repo / ".git" / "reftable").mkdir(parents=True)
+        (repo / ".git" / "HEAD").write_text("ref: refs/heads/.invalid\n")
+        fake_git.branch, fake_git.top = "feature\n", f"{repo}\n"
+
+        assert get_workspace_name(cwd=str(repo)) == "myrepo-feature"
+        assert len(fake_git.calls) == 1
+
+    def test_linked_worktree_git_file_falls_back_to_git(self, tmp_path, monkeypatch, fake_git):
+        """A .git file (linked worktree) stops the walk and defers to git."""
+        monkeypatch.setattr(us, "_read_git_head", _real_read_git_head)
+        repo = tmp_path / "some-repo"
+        repo.mkdir()
+        (repo / ".git").write_text("gitdir: /elsewhere/.git/worktrees/some-repo\n")
+        (tmp_path / ".git").mkdir()
+        (tmp_path / ".git" / "HEAD").write_text("ref: refs/heads/outer\n")
+        fake_git.branch, fake_git.top = "feature\n", f"{repo}\n"
+
+        assert get_workspace_name(cwd=str(repo)) == "some-repo-feature"
+
+    def test_main_worktree_status_writes_to_repo_qualified_file(self, tmp_path, monkeypatch, fake_git):
         """When in main worktree, status file should use repo-qualified name (e.g., stardust-labs-master.json)."""
-        from io import StringIO
-
-        import update_status as us
-
         input_data = {
             "hook_event_name": "Stop",
             "session_id": "test-session",
             "cwd": "/Users/charlie/cs/stardust-labs",
         }
-        stdin_mock = StringIO(json.dumps(input_data))
-
-        def mock_run(cmd, **kwargs):
-            if "--abbrev-ref" in cmd:
-                return type("Result", (), {"returncode": 0, "stdout": "master\n"})()
-            if "--show-toplevel" in cmd:
-                return type("Result", (), {"returncode": 0, "stdout": "/Users/charlie/cs/stardust-labs\n"})()
-            return type("Result", (), {"returncode": 1, "stdout": ""})()
-
-        with (
-            patch.object(sys, "stdin", stdin_mock),
-            patch.object(us, "get_status_dir", return_value=tmp_path),
-            patch("os.getcwd", return_value="/Users/charlie/cs/stardust-labs"),
-            patch("subprocess.run", side_effect=mock_run),
-        ):
-            original_argv = sys.argv
-            sys.argv = ["update-status.py"]
-            try:
-                us.main()
-            except SystemExit:
-                pass
-            finally:
-                sys.argv = original_argv
+        stdin_mock = _stdin(json.dumps(input_data))
+        fake_git.branch, fake_git.top = "master\n", "/Users/charlie/cs/stardust-labs\n"
+
+        monkeypatch.setattr(sys, "stdin", stdin_mock)
+        monkeypatch.setattr(us, "get_status_dir", lambda: tmp_path)
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/cs/stardust-labs")
+
+        monkeypatch.setattr(sys, "argv", ["update-status.py"])
+        with pytest.raises(SystemExit):
+            us.main()
 
         # Should write to stardust-labs-master.json (repo-qualified), NOT master.json
         status_file = tmp_path / "stardust-labs-master.json"
         assert status_file.exists(), "Status should be written to stardust-labs-master.json for main worktree"
-        result = json.loads(status_file.read_text())
+        result = _load(status_file)
         assert result["workspaceName"] == "stardust-labs-master"
         assert result["status"] == "waiting_for_input"
 
@@ -206,6 +339,48 @@ class TestGetWorkspaceName:
         assert not unknown_file.exists(), "Should NOT write to unknown.json when branch is detected"
 
 
+class TestLogDebug:
+    def test_reuses_one_handle_across_calls(self, tmp_path, monkeypatch):
+        opens: list[str] = []
+        real_open = open
+
+        def recording_open(file, *args, **kwargs):
+            opens.append(str(file))
+            return real_open(file, *args, **kwargs)
+
+        monkeypatch.setenv("HOME", str(tmp_path))
+        monkeypatch.setattr(us, "DEBUG", True)
+        monkeypatch.setattr(us, "_log_fh", None)
+        monkeypatch.setattr(builtins, "open", recording_open)
+        us.log_debug("first", {"hook_event_name": "Stop"})
+        us.log_debug("second")
+        monkeypatch.setattr(builtins, "open", real_open)
+        us._log_fh.close()
+
+        log_file = tmp_path / ".pappardelle" / "logs" / "hook-events.log"
+        assert opens == [str(log_file)]
+        content = log_file.read_text()
+        assert "] first\n" in content
+        assert '"hook_event_name": "Stop"' in content
+        assert content.endswith("] second\n")
+
+
+class TestGetStatusDir:
+    def test_uses_env_override(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("PAPPARDELLE_STATUS_DIR", str(tmp_path))
+        assert get_status_dir() == str(tmp_path)
+
+    def test_defaults_under_home(self, monkeypatch):
+        monkeypatch.delenv("PAPPARDELLE_STATUS_DIR", raising=False)
+        assert get_status_dir() == str(Path.home() / ".pappardelle" / "claude-status")
+
+    def test_is_resolved_once_per_process(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("PAPPARDELLE_STATUS_DIR", str(tmp_path))
+        first = get_status_dir()
+        monkeypatch.setenv("PAPPARDELLE_STATUS_DIR", str(tmp_path / "other"))
+        assert get_status_dir() is first
+
+
 class TestStatusDetermination:
     """Tests for determining status from hook events.
 
@@ -213,328 +388,153 @@ class TestStatusDetermination:
     uniformly without tool-specific special-casing.
     """
 
-    def _create_hook_input(
-        self,
-        hook_event: str,
-        tool_name: Optional[str] = None,
-        notification_type: Optional[str] = None,
-        session_id: str = "test-session",
-        cwd: str = "/Users/charlie/.worktrees/stardust-labs/STA-999",
-    ) -> dict[str, Any]:
-        """Helper to create hook input dict."""
-        data: dict[str, Any] = {
-            "hook_event_name": hook_event,
-            "session_id": session_id,
-            "cwd": cwd,
-        }
-        if tool_name:
-            data["tool_name"] = tool_name
-        if notification_type:
-            data["notification_type"] = notification_type
-        return data
-
-    def _run_hook_with_input(self, input_data: dict, temp_dir: Path) -> Optional[dict]:
+    def _run_hook_with_input(self, input_data: dict, status_file: Path, monkeypatch) -> Optional[dict]:
         """Run the hook logic and return the written status file contents."""
-        from io import StringIO
-
-        import update_status as us
+        return self._run_hook_with_payload(json.dumps(input_data), status_file, monkeypatch)
 
+    def _run_hook_with_payload(self, payload: str, status_file: Path, monkeypatch) -> Optional[dict]:
+        """Run the hook on an already-serialized stdin payload."""
         # Patch stdin to provide the hook input
-        stdin_mock = StringIO(json.dumps(input_data))
-
+        monkeypatch.setattr(sys, "stdin", _stdin(payload))
         # Patch status dir to use temp directory
-        with (
-            patch.object(sys, "stdin", stdin_mock),
-            patch.object(us, "get_status_dir", return_value=temp_dir),
-            patch("os.getcwd", return_value="/Users/charlie/.worktrees/stardust-labs/STA-999"),
-        ):
-
-            # Reset argv to simulate no command line args
-            original_argv = sys.argv
-            sys.argv = ["update-status.py"]
-
-            try:
-                us.main()
-            except SystemExit:
-                pass
-            finally:
-                sys.argv = original_argv
+        monkeypatch.setattr(us, "get_status_dir", lambda: status_file.parent)
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/.worktrees/stardust-labs/STA-999")
+
+        # Simulate no command line args
+        monkeypatch.setattr(sys, "argv", ["update-status.py"])
+        with pytest.raises(SystemExit):
+            us.main()
 
         # Read the status file
-        status_file = temp_dir / "STA-999.json"
         if status_file.exists():
-            return json.loads(status_file.read_text())
+            return _load(status_file)
         return None
 
     # =========================================================================
-    # Processing / Tool Use Tests
-    # =========================================================================
-
-    def test_user_prompt_submit_sets_processing(self, tmp_path):
-        """UserPromptSubmit should set status to 'processing'."""
-        input_data = self._create_hook_input(hook_event="UserPromptSubmit")
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is not None
-        assert result["status"] == "processing"
-
-    def test_pre_tool_use_sets_running_tool(self, tmp_path):
-        """PreToolUse should set status to 'running_tool'."""
-        input_data = self._create_hook_input(
-            hook_event="PreToolUse",
-            tool_name="Bash",
-        )
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is not None
-        assert result["status"] == "running_tool"
-
-    def test_post_tool_use_sets_processing(self, tmp_path):
-        """PostToolUse should set 'processing' for all tools uniformly."""
-        input_data = self._create_hook_input(
-            hook_event="PostToolUse",
-            tool_name="Read",
-        )
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is not None
-        assert result["status"] == "processing"
-
-    def test_post_tool_use_ask_user_question_sets_processing(self, tmp_path):
-        """PostToolUse for AskUserQuestion sets 'processing' — no special-casing."""
-        input_data = self._create_hook_input(
-            hook_event="PostToolUse",
-            tool_name="AskUserQuestion",
-        )
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is not None
-        assert result["status"] == "processing", "No tool-specific special-casing (Claude Island model)"
-
-    # =========================================================================
-    # Permission Request Tests
+    # Event -> Status Mapping
     # =========================================================================
 
-    def test_permission_request_sets_waiting_for_approval(self, tmp_path):
-        """PermissionRequest should set 'waiting_for_approval' uniformly."""
-        input_data = self._create_hook_input(
-            hook_event="PermissionRequest",
-            tool_name="Bash",
-        )
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is not None
-        assert result["status"] == "waiting_for_approval"
-
-    def test_permission_request_ask_user_question_sets_waiting_for_approval(self, tmp_path):
-        """PermissionRequest for AskUserQuestion also sets 'waiting_for_approval' — no special-casing.
-
-        The UI layer differentiates by checking currentTool == 'AskUserQuestion'.
-        """
-        input_data = self._create_hook_input(
+    @pytest.mark.parametrize(
+        "hook_event,tool_name,notification_type,expected",
+        _EVENT_CASES,
+    )
+    def test_event_maps_to_status(self, status_file, monkeypatch, hook_event, tool_name, notification_type, expected):
+        """Each hook event sets its status; ignored events write no status file."""
+        payload = _SERIALIZED_INPUTS[(hook_event, tool_name, notification_type)]
+
+        result = self._run_hook_with_payload(payload, status_file, monkeypatch)
+
+        if expected is None:
+            assert result is None
+        else:
+            assert result is not None
+            assert result["status"] == expected
+
+    def test_permission_request_preserves_ask_user_question_tool(self, status_file, monkeypatch):
+        """The UI layer differentiates AskUserQuestion by checking currentTool."""
+        input_data = _create_hook_input(
             hook_event="PermissionRequest",
             tool_name="AskUserQuestion",
         )
 
-        result = self._run_hook_with_input(input_data, tmp_path)
+        result = self._run_hook_with_input(input_data, status_file, monkeypatch)
 
         assert result is not None
-        assert result["status"] == "waiting_for_approval", "No tool-specific special-casing (Claude Island model)"
         assert result.get("currentTool") == "AskUserQuestion", "Tool name must be preserved for UI differentiation"
 
-    # =========================================================================
-    # Stop / Session Lifecycle Tests
-    # =========================================================================
-
-    def test_stop_sets_waiting_for_input(self, tmp_path):
-        """Stop should set 'waiting_for_input' (Claude finished turn, session still active)."""
-        input_data = self._create_hook_input(hook_event="Stop")
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is not None
-        assert result["status"] == "waiting_for_input"
-
-    def test_session_start_sets_waiting_for_input(self, tmp_path):
-        """SessionStart should set 'waiting_for_input'."""
-        input_data = self._create_hook_input(hook_event="SessionStart")
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is not None
-        assert result["status"] == "waiting_for_input"
-
-    def test_session_end_sets_ended(self, tmp_path):
-        """SessionEnd should set 'ended' (distinct from waiting_for_input)."""
-        input_data = self._create_hook_input(hook_event="SessionEnd")
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is not None
-        assert result["status"] == "ended"
-
-    def test_subagent_stop_sets_waiting_for_input(self, tmp_path):
-        """SubagentStop should set 'waiting_for_input' (parent back to waiting)."""
-        input_data = self._create_hook_input(hook_event="SubagentStop")
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is not None
-        assert result["status"] == "waiting_for_input"
-
-    # =========================================================================
-    # Compaction Tests
-    # =========================================================================
-
-    def test_pre_compact_sets_compacting(self, tmp_path):
-        """PreCompact should set 'compacting' (distinct status)."""
-        input_data = self._create_hook_input(hook_event="PreCompact")
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is not None
-        assert result["status"] == "compacting"
-
-    # =========================================================================
-    # Notification Tests
-    # =========================================================================
-
-    def test_notification_idle_prompt_sets_waiting_for_input(self, tmp_path):
-        """idle_prompt notification should set 'waiting_for_input'."""
-        input_data = self._create_hook_input(
-            hook_event="Notification",
-            notification_type="idle_prompt",
-        )
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is not None
-        assert result["status"] == "waiting_for_input"
-
-    def test_notification_permission_prompt_does_not_update(self, tmp_path):
-        """permission_prompt notification should not update status (PermissionRequest handles it)."""
-        input_data = self._create_hook_input(
-            hook_event="Notification",
-            notification_type="permission_prompt",
-        )
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is None, "permission_prompt notifications should be ignored (PermissionRequest handles this)"
-
-    def test_notification_other_type_does_not_update(self, tmp_path):
-        """Notification with unrecognized type should not update status."""
-        input_data = self._create_hook_input(
-            hook_event="Notification",
-            notification_type="some_other_type",
-        )
-
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is None
-
     # =========================================================================
     # Rich Data Tests
     # =========================================================================
 
-    def test_status_file_includes_event(self, tmp_path):
+    def test_status_file_includes_event(self, status_file, monkeypatch):
         """Status file should include the raw hook event name."""
-        input_data = self._create_hook_input(hook_event="PreToolUse", tool_name="Bash")
+        input_data = _create_hook_input(hook_event="PreToolUse", tool_name="Bash")
 
-        result = self._run_hook_with_input(input_data, tmp_path)
+        result = self._run_hook_with_input(input_data, status_file, monkeypatch)
 
         assert result is not None
         assert result.get("event") == "PreToolUse"
 
-    def test_status_file_includes_cwd(self, tmp_path):
+    def test_status_file_includes_cwd(self, status_file, monkeypatch):
         """Status file should include the working directory."""
-        input_data = self._create_hook_input(
+        input_data = _create_hook_input(
             hook_event="UserPromptSubmit",
             cwd="/Users/charlie/.worktrees/stardust-labs/STA-999",
         )
 
-        result = self._run_hook_with_input(input_data, tmp_path)
+        result = self._run_hook_with_input(input_data, status_file, monkeypatch)
 
         assert result is not None
         assert result.get("cwd") == "/Users/charlie/.worktrees/stardust-labs/STA-999"
 
-    # =========================================================================
-    # Edge Cases
-    # =========================================================================
-
-    def test_unknown_event_does_not_update(self, tmp_path):
-        """Unknown hook events should not update status."""
-        input_data = self._create_hook_input(hook_event="SomeUnknownEvent")
+    def test_status_file_is_compact_json(self, status_file, monkeypatch):
+        """Status file is machine-read, so it's written without pretty-printing."""
+        self._run_hook_with_input(_create_hook_input(hook_event="Stop"), status_file, monkeypatch)
 
-        result = self._run_hook_with_input(input_data, tmp_path)
-
-        assert result is None
+        raw = status_file.read_bytes()
+        assert b"\n" not in raw
+        assert b'"status":"waiting_for_input"' in raw
 
 
 class TestCommandLineArgs:
     """Tests for command line argument handling."""
 
-    def test_explicit_status_arg_overrides_hook_event(self, tmp_path):
+    def test_explicit_status_arg_overrides_hook_event(self, status_file, monkeypatch):
         """Command line status arg should be used directly."""
-        from io import StringIO
+        monkeypatch.setattr(sys, "stdin", _stdin(_EMPTY_STDIN_TEXT))
+        monkeypatch.setattr(us, "get_status_dir", lambda: status_file.parent)
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/.worktrees/stardust-labs/STA-999")
 
-        import update_status as us
+        monkeypatch.setattr(sys, "argv", ["update-status.py", "waiting_for_input"])
+        with pytest.raises(SystemExit):
+            us.main()
 
-        stdin_mock = StringIO("{}")
+        result = _load(status_file)
+        assert result["status"] == "waiting_for_input"
 
-        with (
-            patch.object(sys, "stdin", stdin_mock),
-            patch.object(us, "get_status_dir", return_value=tmp_path),
-            patch("os.getcwd", return_value="/Users/charlie/.worktrees/stardust-labs/STA-999"),
-        ):
+    def test_tool_arg_is_stored(self, status_file, monkeypatch):
+        """--tool argument should be stored in status file."""
+        monkeypatch.setattr(sys, "stdin", _stdin(_EMPTY_STDIN_TEXT))
+        monkeypatch.setattr(us, "get_status_dir", lambda: status_file.parent)
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/.worktrees/stardust-labs/STA-999")
 
-            original_argv = sys.argv
-            sys.argv = ["update-status.py", "waiting_for_input"]
+        monkeypatch.setattr(sys, "argv", ["update-status.py", "running_tool", "--tool", "Bash"])
+        with pytest.raises(SystemExit):
+            us.main()
 
-            try:
-                us.main()
-            except SystemExit:
-                pass
-            finally:
-                sys.argv = original_argv
+        result = _load(status_file)
+        assert result["status"] == "running_tool"
+        assert result.get("currentTool") == "Bash"
 
-        status_file = tmp_path / "STA-999.json"
-        result = json.loads(status_file.read_text())
-        assert result["status"] == "waiting_for_input"
+    def test_status_arg_from_terminal_does_not_read_stdin(self, status_file, monkeypatch):
+        """A manual run with a status arg must not block reading an interactive stdin."""
 
-    def test_tool_arg_is_stored(self, tmp_path):
-        """--tool argument should be stored in status file."""
-        from io import StringIO
+        def blocked_read():
+            raise AssertionError("stdin should not be read from a terminal")
 
-        import update_status as us
+        tty = SimpleNamespace(isatty=lambda: True, buffer=SimpleNamespace(read=blocked_read))
+        monkeypatch.setattr(sys, "stdin", tty)
+        monkeypatch.setattr(us, "get_status_dir", lambda: status_file.parent)
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/.worktrees/stardust-labs/STA-999")
 
-        stdin_mock = StringIO("{}")
+        monkeypatch.setattr(sys, "argv", ["update-status.py", "waiting_for_input"])
+        with pytest.raises(SystemExit):
+            us.main()
 
-        with (
-            patch.object(sys, "stdin", stdin_mock),
-            patch.object(us, "get_status_dir", return_value=tmp_path),
-            patch("os.getcwd", return_value="/Users/charlie/.worktrees/stardust-labs/STA-999"),
-        ):
+        assert _load(status_file)["status"] == "waiting_for_input"
 
-            original_argv = sys.argv
-            sys.argv = ["update-status.py", "running_tool", "--tool", "Bash"]
+    @pytest.mark.parametrize("stdin_text", ["", "not json"])
+    def test_unreadable_stdin_still_applies_status_arg(self, status_file, monkeypatch, stdin_text):
+        """Empty or malformed stdin is treated as an empty payload."""
+        monkeypatch.setattr(sys, "stdin", _stdin(stdin_text))
+        monkeypatch.setattr(us, "get_status_dir", lambda: status_file.parent)
+        monkeypatch.setattr(os, "getcwd", lambda: "/Users/charlie/.worktrees/stardust-labs/STA-999")
 
-            try:
-                us.main()
-            except SystemExit:
-                pass
-            finally:
-                sys.argv = original_argv
+        monkeypatch.setattr(sys, "argv", ["update-status.py", "processing"])
+        with pytest.raises(SystemExit):
+            us.main()
 
-        status_file = tmp_path / "STA-999.json"
-        result = json.loads(status_file.read_text())
-        assert result["status"] == "running_tool"
-        assert result.get("currentTool") == "Bash"
+        assert _load(status_file)["status"] == "processing"
 
 
 class TestAtomicWrite:
@@ -547,68 +547,143 @@ class TestAtomicWrite:
     target's directory entry always points at a complete file.
     """
 
-    def test_rewrite_swaps_inode_via_atomic_rename(self, tmp_path):
+    def test_rewrite_swaps_inode_via_atomic_rename(self, tmp_path, monkeypatch):
         """Two sequential writes must land on distinct inodes.
 
         An in-place ``writeFileSync``/``open(..., "w")`` keeps the same inode
         (truncate + rewrite). ``os.replace`` swaps in a new inode. The inode
         check is a deterministic structural signal that the writer is atomic.
         """
-        with patch.object(update_status_module, "get_status_dir", return_value=tmp_path):
-            update_status("processing", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9101")
-            status_file = tmp_path / "STA-9101.json"
-            assert status_file.exists()
-            inode_before = status_file.stat().st_ino
+        monkeypatch.setattr(update_status_module, "get_status_dir", lambda: tmp_path)
+        update_status("processing", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9101")
+        status_file = tmp_path / "STA-9101.json"
+        assert status_file.exists()
+        inode_before = status_file.stat().st_ino
 
-            update_status("running_tool", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9101")
-            inode_after = status_file.stat().st_ino
+        update_status("running_tool", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9101")
+        inode_after = status_file.stat().st_ino
 
         assert inode_before != inode_after, "rewrite must replace the inode (atomic rename), not truncate in place"
 
-    def test_no_tmp_files_remain_after_successful_write(self, tmp_path):
+    def test_creates_missing_status_dir(self, tmp_path, monkeypatch):
+        """The status dir is created lazily when the first write finds it missing."""
+        status_dir = tmp_path / "nested" / "claude-status"
+        monkeypatch.setattr(update_status_module, "get_status_dir", lambda: status_dir)
+        update_status("processing", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9105")
+
+        assert _load(status_dir / "STA-9105.json")["status"] == "processing"
+
+    def test_identical_stable_status_is_not_rewritten(self, tmp_path, monkeypatch):
+        """Re-reporting the same stable state leaves the file (and its lastUpdate) alone."""
+        cwd = "/Users/charlie/.worktrees/stardust-labs/STA-9106"
+        monkeypatch.setattr(update_status_module, "get_status_dir", lambda: tmp_path)
+        status_file = tmp_path / "STA-9106.json"
+
+        update_status("waiting_for_input", session_id="s", event="Stop", cwd=cwd)
+        before = status_file.stat().st_ino, _load(status_file)["lastUpdate"]
+        monkeypatch.setattr(us.time, "time_ns", lambda: 10**18)
+        update_status("waiting_for_input", session_id="s", event="Stop", cwd=cwd)
+
+        assert (status_file.stat().st_ino, _load(status_file)["lastUpdate"]) == before
+
+    @pytest.mark.parametrize(
+        "first,second",
+        [
+            # Active statuses must refresh lastUpdate or the TUI marks them stale
+            (("processing", "PostToolUse"), ("processing", "PostToolUse")),
+            # Same stable status but different event is a real change
+            (("waiting_for_input", "SubagentStop"), ("waiting_for_input", "Stop")),
+        ],
+    )
+    def test_active_or_changed_state_is_rewritten(self, tmp_path, monkeypatch, first, second):
+        cwd = "/Users/charlie/.worktrees/stardust-labs/STA-9107"
+        monkeypatch.setattr(update_status_module, "get_status_dir", lambda: tmp_path)
+        status_file = tmp_path / "STA-9107.json"
+
+        update_status(first[0], session_id="s", event=first[1], cwd=cwd)
+        monkeypatch.setattr(us.time, "time_ns", lambda: 10**18)
+        update_status(second[0], session_id="s", event=second[1], cwd=cwd)
+
+        result = _load(status_file)
+        assert result["lastUpdate"] == 10**12
+        assert result["event"] == second[1]
+
+    def test_short_writes_are_completed(self, tmp_path, monkeypatch):
+        """A write() that lands only part of the payload is retried for the rest."""
+        real_write = os.write
+        chunks: list[int] = []
+
+        def one_byte_write(fd, data):
+            chunks.append(1)
+            return real_write(fd, bytes(data[:1]))
+
+        monkeypatch.setattr(update_status_module, "get_status_dir", lambda: tmp_path)
+        monkeypatch.setattr(os, "write", one_byte_write)
+        update_status("processing", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9108")
+        monkeypatch.undo()
+
+        result = _load(tmp_path / "STA-9108.json")
+        assert result["status"] == "processing"
+        assert len(chunks) > 1
+
+    def test_write_making_no_progress_aborts_without_installing_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(update_status_module, "get_status_dir", lambda: tmp_path)
+        monkeypatch.setattr(os, "write", lambda fd, data: 0)
+        with pytest.raises(OSError, match="short write"):
+            update_status("processing", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9109")
+
+        assert [p.name for p in tmp_path.iterdir()] == []
+
+    def test_no_tmp_files_remain_after_successful_write(self, tmp_path, monkeypatch):
         """After a happy-path write the temp sibling must be consumed by the rename."""
-        with patch.object(update_status_module, "get_status_dir", return_value=tmp_path):
-            update_status("processing", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9102")
-            update_status("running_tool", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9102")
+        monkeypatch.setattr(update_status_module, "get_status_dir", lambda: tmp_path)
+        update_status("processing", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9102")
+        update_status("running_tool", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9102")
 
         stragglers = [p.name for p in tmp_path.iterdir() if ".tmp." in p.name]
         assert stragglers == [], f"tmp file(s) leaked: {stragglers}"
 
-    def test_tmp_file_is_cleaned_up_when_rename_fails(self, tmp_path):
+    def test_tmp_file_is_cleaned_up_when_rename_fails(self, tmp_path, monkeypatch):
         """If ``os.replace`` raises, the sibling tmp file must be unlinked
         before the exception propagates — otherwise a crashy writer would
         leave orphan ``*.tmp.<pid>`` files in the status dir forever.
         """
         cwd = "/Users/charlie/.worktrees/stardust-labs/STA-9104"
 
-        with (
-            patch.object(update_status_module, "get_status_dir", return_value=tmp_path),
-            patch.object(update_status_module.os, "replace", side_effect=OSError("simulated replace failure")),
-        ):
-            with pytest.raises(OSError, match="simulated replace failure"):
-                update_status("processing", cwd=cwd)
+        def failing_replace(src, dst):
+            raise OSError("simulated replace failure")
+
+        monkeypatch.setattr(update_status_module, "get_status_dir", lambda: tmp_path)
+        monkeypatch.setattr(update_status_module.os, "replace", failing_replace)
+        with pytest.raises(OSError, match="simulated replace failure"):
+            update_status("processing", cwd=cwd)
 
         stragglers = [p.name for p in tmp_path.iterdir() if ".tmp." in p.name]
         assert stragglers == [], f"failed write must not leave .tmp.<pid> orphans behind: {stragglers}"
 
-    def test_target_path_is_never_opened_in_write_mode(self, tmp_path):
-        """Atomic write contract: ``open`` must never be called with the
-        target path in write mode. Writes go to a sibling tmp path that is
+    def test_target_path_is_never_opened_in_write_mode(self, tmp_path, monkeypatch):
+        """Atomic write contract: ``open``/``os.open`` must never be called
+        with the target path in write mode. Writes go to a sibling tmp path that is
         then renamed into place.
         """
         opens: list[tuple[str, str]] = []
         real_open = open
+        real_os_open = os.open
 
         def recording_open(file, mode="r", *args, **kwargs):
             opens.append((str(file), mode))
             return real_open(file, mode, *args, **kwargs)
 
+        def recording_os_open(path, flags, *args, **kwargs):
+            opens.append((str(path), "w" if flags & (os.O_WRONLY | os.O_RDWR) else "r"))
+            return real_os_open(path, flags, *args, **kwargs)
+
         target = tmp_path / "STA-9103.json"
-        with (
-            patch.object(update_status_module, "get_status_dir", return_value=tmp_path),
-            patch("builtins.open", side_effect=recording_open),
-        ):
-            update_status("processing", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9103")
+        monkeypatch.setattr(update_status_module, "get_status_dir", lambda: tmp_path)
+        monkeypatch.setattr(builtins, "open", recording_open)
+        monkeypatch.setattr(os, "open", recording_os_open)
+        update_status("processing", cwd="/Users/charlie/.worktrees/stardust-labs/STA-9103")
+        monkeypatch.undo()
 
         write_opens_on_target = [(p, m) for (p, m) in opens if p == str(target) and "w" in m]
         assert write_opens_on_target == [], (
@@ -618,7 +693,7 @@ class TestAtomicWrite:
 
         # And confirm the final file ended up readable + correct.
         assert target.exists()
-        payload = json.loads(target.read_text())
+        payload = _load(target)
         assert payload["status"] == "processing"
 
 
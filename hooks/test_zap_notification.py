@@ -5,18 +5,12 @@ Tests for zap-notification.py hook script.
 Run with: uv run pytest _dev/scripts/pappardelle/hooks/test_zap_notification.py -v
 """
 
-import importlib.util
 import sys
-from pathlib import Path
 from unittest.mock import MagicMock, patch
 
-_module_path = Path(__file__).parent / "zap-notification.py"
-_spec = importlib.util.spec_from_file_location("zap_notification", _module_path)
-assert _spec is not None
-assert _spec.loader is not None
-zap_mod = importlib.util.module_from_spec(_spec)
-sys.modules["zap_notification"] = zap_mod
-_spec.loader.exec_module(zap_mod)
+from conftest import load_hook
+
+zap_mod = load_hook("zap-notification")
 
 is_tailscale_ssh_active = zap_mod.is_tailscale_ssh_active
 send_zap = zap_mod.send_zap
@@ -18,97 +18,210 @@ Status values:
     - error: An error occurred
 """
 
+import functools
 import json
 import os
-import subprocess
+import re
 import sys
-from datetime import datetime
-from pathlib import Path
-from typing import Any, Optional
+import time
+from typing import Any, Optional, TextIO
+
+# orjson is optional; when present it parses the stdin payload and serializes
+# the status payload straight from/to bytes in C. Both paths emit compact JSON
+# — the file is read by the TUI, not by people, so pretty-printing only
+# inflates every write. Both loads raise ValueError subclasses on bad input.
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _dump_state(state: dict[str, Any]) -> bytes:
+        return orjson.dumps(state)
+
+except ImportError:
+    _json_loads = json.loads
+
+    def _dump_state(state: dict[str, Any]) -> bytes:
+        return json.dumps(state, separators=(",", ":")).encode()
+
 
 # Debug mode - logs all hook events to a file
 # Set PAPPARDELLE_DEBUG=1 environment variable to enable logging
 DEBUG = os.environ.get("PAPPARDELLE_DEBUG", "0") == "1"
 
+# Issue-key path component (e.g., STA-123, ABC-45), compiled once at import
+_WORKTREE_RE = re.compile(r"(?:^|/)([A-Z]+-\d+)(?:/|$)")
+
+# Statuses the TUI never treats as stale (mirrors STABLE_STATUSES in
+# source/types.ts)
+_STABLE_STATUSES = frozenset({"waiting_for_input", "waiting_for_approval", "ended", "error"})
+
+# Hook event -> status. Notification is handled separately in main() since it
+# depends on notification_type.
+_EVENT_STATUS = {
+    "UserPromptSubmit": "processing",
+    "PreToolUse": "running_tool",
+    "PostToolUse": "processing",
+    "PermissionRequest": "waiting_for_approval",
+    "Stop": "waiting_for_input",
+    "SubagentStop": "waiting_for_input",
+    "SessionStart": "waiting_for_input",
+    "SessionEnd": "ended",
+    "PreCompact": "compacting",
+}
+
+
+# Debug log handle, opened on first use and left for interpreter exit to close
+_log_fh: Optional[TextIO] = None
+
 
 def log_debug(message: str, data: Any = None) -> None:
     """Log debug information to a file."""
+    global _log_fh
     if not DEBUG:
         return
-    log_dir = Path.home() / ".pappardelle" / "logs"
-    log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / "hook-events.log"
+    if _log_fh is None:
+        log_dir = os.path.join(os.path.expanduser("~"), ".pappardelle", "logs")
+        os.makedirs(log_dir, exist_ok=True)
+        # Line-buffered so entries survive a hook that dies mid-run
+        _log_fh = open(os.path.join(log_dir, "hook-events.log"), "a", buffering=1)
+
+    now_ms = time.time_ns() // 1_000_000
+    timestamp = f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now_ms // 1000))}.{now_ms % 1000:03d}"
+    entry = f"[{timestamp}] {message}\n"
+    if data:
+        entry += f"  Data: {json.dumps(data, indent=2)}\n"
+    _log_fh.write(entry)
+
 
-    timestamp = datetime.now().isoformat()
-    with open(log_file, "a") as f:
-        f.write(f"[{timestamp}] {message}\n")
-        if data:
-            f.write(f"  Data: {json.dumps(data, indent=2)}\n")
+@functools.lru_cache(maxsize=32)
+def _git(cwd: str, *args: str) -> tuple[int, tuple[str, ...]]:
+    """Run a git command in cwd and return (exit code, stdout lines).
 
+    Output is kept even when git exits non-zero: rev-parse prints the values it
+    resolved before failing on a later argument, so callers must check the
+    exit code before trusting it. Returns (-1, ()) if git can't run at all.
+    Memoized per (cwd, args) so repeated lookups in the same process don't
+    fork git again.
+    """
+    import subprocess
 
-# Get workspace name from cwd (assumes worktree naming convention)
+    try:
+        result = subprocess.run(
+            ["git", *args],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+    except Exception:
+        return -1, ()
+    return result.returncode, tuple(result.stdout.splitlines())
+
+
+def _read_git_head(cwd: str) -> Optional[tuple[str, str]]:
+    """Find the enclosing repo's toplevel and branch without spawning git.
+
+    Returns (toplevel, branch), or None when git has to be asked instead: no
+    .git directory above cwd, a .git file (linked worktree or submodule), a
+    detached HEAD, or a reftable repo (whose .git/HEAD is a stub pointing at
+    refs/heads/.invalid; the real HEAD lives under .git/reftable/).
+    """
+    path = cwd
+    while True:
+        git_dir = os.path.join(path, ".git")
+        if os.path.isdir(git_dir):
+            break
+        if os.path.exists(git_dir):
+            return None
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+    try:
+        with open(os.path.join(git_dir, "HEAD"), encoding="utf-8") as f:
+            head = f.read().strip()
+    except (OSError, ValueError):
+        return None
+    prefix = "ref: refs/heads/"
+    if not head.startswith(prefix):
+        return None
+    branch = head[len(prefix) :]
+    if branch == ".invalid" or os.path.isdir(os.path.join(git_dir, "reftable")):
+        return None
+    return path, branch
+
+
+# Get workspace name from cwd (assumes worktree naming convention).
+# Memoized: the answer for a given cwd can't change within one hook process.
+@functools.cache
 def get_workspace_name(cwd: Optional[str] = None) -> str:
     if cwd is None:
         try:
             cwd = os.getcwd()
         except OSError:
             return "unknown"
-    parts = cwd.split("/")
 
     # Look for Linear issue pattern (e.g., STA-123) in path components
     # Expected path: ~/.worktrees/stardust-labs/STA-123/...
-    for part in parts:
-        if part and "-" in part:
-            prefix = part.split("-")[0]
-            suffix = part.split("-", 1)[1] if "-" in part else ""
-            # Check if it looks like a Linear issue (e.g., STA-123, ABC-45)
-            if prefix.isupper() and prefix.isalpha() and suffix.isdigit():
-                return part
+    match = _WORKTREE_RE.search(cwd)
+    if match:
+        return match.group(1)
 
     # No issue key found — likely the main worktree. Detect branch name via git
     # and qualify with repo name to avoid collisions across repos
     # (e.g. "stardust-labs-master" instead of just "master").
-    try:
-        branch_result = subprocess.run(
-            ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
-        if branch_result.returncode == 0:
-            branch = branch_result.stdout.strip()
-            if branch:
-                # Try to get repo name from git toplevel
-                try:
-                    toplevel_result = subprocess.run(
-                        ["git", "rev-parse", "--show-toplevel"],
-                        capture_output=True,
-                        text=True,
-                        timeout=5,
-                    )
-                    if toplevel_result.returncode == 0:
-                        repo_name = os.path.basename(toplevel_result.stdout.strip())
-                        if repo_name:
-                            return f"{repo_name}-{branch}"
-                except Exception:
-                    pass
-                # Fall back to branch only if we can't determine repo name
-                return branch
-    except Exception:
-        pass
+    # Plain checkouts can be read straight from .git/HEAD; both resolvers look
+    # at the same directory, so they always agree on which repo this is.
+    head = _read_git_head(cwd)
+    if head:
+        toplevel, branch = head
+        repo_name = os.path.basename(toplevel)
+        return f"{repo_name}-{branch}" if repo_name else branch
+
+    # Otherwise ask git: one rev-parse prints the branch then the toplevel
+    returncode, lines = _git(cwd, "rev-parse", "--abbrev-ref", "HEAD", "--show-toplevel")
+    branch = lines[0].strip() if lines else ""
+    # A failed run may still echo "HEAD" back (e.g. an unborn branch in an
+    # orphan worktree); only a real branch name survives a non-zero exit.
+    if returncode != 0 and branch == "HEAD":
+        branch = ""
+    if branch:
+        # Repo name from git toplevel (missing when e.g. run inside .git/)
+        repo_name = os.path.basename(lines[1].strip()) if len(lines) > 1 else ""
+        if repo_name:
+            return f"{repo_name}-{branch}"
+        # Fall back to branch only if we can't determine repo name
+        return branch
 
     return "unknown"
 
 
-def get_status_dir() -> Path:
+@functools.cache
+def get_status_dir() -> str:
     """Get the status directory path.
 
     Uses PAPPARDELLE_STATUS_DIR env var if set, otherwise defaults to ~/.pappardelle/claude-status/.
+    Resolved once per process.
     """
     env_dir = os.environ.get("PAPPARDELLE_STATUS_DIR")
     if env_dir:
-        return Path(env_dir)
-    return Path.home() / ".pappardelle" / "claude-status"
+        return env_dir
+    return os.path.join(os.path.expanduser("~"), ".pappardelle", "claude-status")
+
+
+def _state_unchanged(status_file: str, state: dict[str, Any]) -> bool:
+    """True if status_file already holds state, ignoring lastUpdate."""
+    try:
+        with open(status_file, "rb") as f:
+            current = _json_loads(f.read())
+    except (OSError, ValueError):
+        return False
+    if not isinstance(current, dict):
+        return False
+    current.pop("lastUpdate", None)
+    return current == {k: v for k, v in state.items() if k != "lastUpdate"}
 
 
 def update_status(
@@ -120,15 +233,13 @@ def update_status(
 ) -> None:
     workspace = get_workspace_name(cwd)
     status_dir = get_status_dir()
-    status_dir.mkdir(parents=True, exist_ok=True)
-
-    status_file = status_dir / f"{workspace}.json"
+    status_file = os.path.join(status_dir, f"{workspace}.json")
 
     state: dict[str, Any] = {
         "sessionId": session_id or os.environ.get("CLAUDE_SESSION_ID", "unknown"),
         "workspaceName": workspace,
         "status": status,
-        "lastUpdate": int(datetime.now().timestamp() * 1000),
+        "lastUpdate": time.time_ns() // 1_000_000,
     }
 
     if tool_name:
@@ -138,30 +249,62 @@ def update_status(
     if cwd:
         state["cwd"] = cwd
 
+    # A repeated stable event (e.g. back-to-back Stop hooks) would only bump
+    # lastUpdate — skip the write. The TUI ignores lastUpdate for stable
+    # statuses; the sous-chef gather script reports it as minutesAgo, which
+    # thus reads as time since the space entered this state. Active statuses
+    # are always rewritten to keep their staleness clock fresh.
+    if status in _STABLE_STATUSES and _state_unchanged(status_file, state):
+        return
+
     # Atomic write: write to a sibling temp file then rename. POSIX rename is
     # atomic, so a concurrent reader always sees either the previous complete
     # file or the new complete file — never a truncated one. If the write
     # raises (disk full, permission denied) before the rename, clean up the
     # orphan so the status dir doesn't accumulate junk across crashes.
-    tmp_file = status_dir / f"{workspace}.json.tmp.{os.getpid()}"
+    tmp_file = f"{status_file}.tmp.{os.getpid()}"
     try:
-        with open(tmp_file, "w") as f:
-            json.dump(state, f, indent=2)
+        # Serialize up front and hand the bytes to raw write() calls, skipping
+        # the buffered file object. A few hundred bytes normally land in one
+        # call, but a short write (e.g. nearly full disk) must never reach the
+        # rename below with a truncated payload.
+        payload = _dump_state(state)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        try:
+            fd = os.open(tmp_file, flags, 0o666)
+        except FileNotFoundError:
+            # Status dir doesn't exist yet (first run) — create it and retry,
+            # rather than paying a mkdir on every event
+            os.makedirs(status_dir, exist_ok=True)
+            fd = os.open(tmp_file, flags, 0o666)
+        try:
+            view = memoryview(payload)
+            while view:
+                written = os.write(fd, view)
+                if written <= 0:
+                    raise OSError(f"short write to {tmp_file}")
+                view = view[written:]
+        finally:
+            os.close(fd)
         os.replace(tmp_file, status_file)
     except Exception:
         try:
-            tmp_file.unlink(missing_ok=True)
+            os.unlink(tmp_file)
         except OSError:
             pass
         raise
 
 
 def main() -> None:
-    # Read hook input from stdin
-    try:
-        input_data = json.load(sys.stdin)
-    except json.JSONDecodeError:
-        input_data = {}
+    # Read hook input from stdin as raw bytes; no payload counts as empty.
+    # A manual call with an explicit status from a terminal has no payload,
+    # and reading would block until the user sends EOF.
+    input_data: dict[str, Any] = {}
+    if len(sys.argv) == 1 or not sys.stdin.isatty():
+        try:
+            input_data = _json_loads(sys.stdin.buffer.read() or b"{}")
+        except ValueError:
+            pass
 
     log_debug(f"Hook invoked with argv={sys.argv}", input_data)
 
@@ -179,36 +322,14 @@ def main() -> None:
         hook_event = input_data.get("hook_event_name", "")
         tool_name = input_data.get("tool_name")
 
-        if hook_event == "UserPromptSubmit":
-            status = "processing"
-        elif hook_event == "PreToolUse":
-            status = "running_tool"
-        elif hook_event == "PostToolUse":
-            status = "processing"
-        elif hook_event == "PermissionRequest":
-            status = "waiting_for_approval"
-        elif hook_event == "Stop":
-            status = "waiting_for_input"
-        elif hook_event == "SubagentStop":
-            status = "waiting_for_input"
-        elif hook_event == "SessionStart":
-            status = "waiting_for_input"
-        elif hook_event == "SessionEnd":
-            status = "ended"
-        elif hook_event == "PreCompact":
-            status = "compacting"
-        elif hook_event == "Notification":
-            notification_type = input_data.get("notification_type")
-            # Skip permission_prompt — PermissionRequest hook handles this
-            if notification_type == "permission_prompt":
-                sys.exit(0)
-            elif notification_type == "idle_prompt":
-                status = "waiting_for_input"
-            else:
+        status = _EVENT_STATUS.get(hook_event)
+        if status is None:
+            # Notification only reports idle prompts; permission_prompt is
+            # covered by the PermissionRequest hook. Anything else (including
+            # unknown events) leaves the status untouched.
+            if hook_event != "Notification" or input_data.get("notification_type") != "idle_prompt":
                 sys.exit(0)
-        else:
-            # Unknown event, don't update status
-            sys.exit(0)
+            status = "waiting_for_input"
 
     session_id = input_data.get("session_id", os.environ.get("CLAUDE_SESSION_ID"))
     event_name = input_data.get("hook_event_name")